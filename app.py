@@ -3,6 +3,7 @@ ShiftWise - AI-Powered Workforce Scheduling & Optimization Dashboard
 A comprehensive solution for retail workforce management and cost optimization.
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -12,7 +13,10 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 
 # Import our custom modules
-from utils.data_prep import create_sample_dataset, save_sample_data
+from utils.data_prep import (
+    SAMPLE_DATA_FILES, create_sample_dataset, load_legacy_csv,
+    sample_data_is_current, save_sample_data
+)
 from utils.optimizer import optimize_workforce_schedule
 from utils.visualization import (
     create_demand_vs_staff_chart, create_cost_breakdown_chart, 
@@ -28,185 +32,100 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling with proper light/dark mode support
-st.markdown("""
-<style>
-    /* Light mode (default) styles */
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .subtitle {
-        text-align: center;
-        color: #6c757d;
-        font-size: 1.2rem;
-        margin-bottom: 2rem;
-    }
-    .section-header {
-        font-size: 1.5rem;
-        font-weight: bold;
-        color: #2c3e50;
-        margin-top: 2rem;
-        margin-bottom: 1rem;
-    }
-    .kpi-card {
-        background-color: #f8f9fa;
-        color: #212529;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #1f77b4;
-        margin: 0.5rem 0;
-    }
-    .insight-box {
-        background-color: #e8f4fd;
-        color: #212529;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #17a2b8;
-        margin: 1rem 0;
-    }
-    .recommendation-box {
-        background-color: #d4edda;
-        color: #212529;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #28a745;
-        margin: 1rem 0;
-    }
-    
-    /* Dark mode specific overrides - only apply when Streamlit is in dark theme */
-    .stApp[data-theme="dark"] .main-header {
-        color: #4A9EFF !important;
-    }
-    .stApp[data-theme="dark"] .subtitle {
-        color: #B0B0B0 !important;
-    }
-    .stApp[data-theme="dark"] .section-header {
-        color: #FFFFFF !important;
-        font-weight: bold !important;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.8) !important;
-    }
-    .stApp[data-theme="dark"] .kpi-card {
-        background-color: #2B2B2B !important;
-        color: #E0E0E0 !important;
-        border-left-color: #4A9EFF !important;
-    }
-    .stApp[data-theme="dark"] .insight-box {
-        background-color: #1A3A4A !important;
-        color: #E0E0E0 !important;
-        border-left-color: #17A2B8 !important;
-    }
-    .stApp[data-theme="dark"] .recommendation-box {
-        background-color: #1A4A2A !important;
-        color: #E0E0E0 !important;
-        border-left-color: #28A745 !important;
-    }
-    
-    /* Ensure Streamlit components are readable in both themes */
-    .stApp[data-theme="dark"] h1, 
-    .stApp[data-theme="dark"] h2, 
-    .stApp[data-theme="dark"] h3, 
-    .stApp[data-theme="dark"] h4, 
-    .stApp[data-theme="dark"] h5, 
-    .stApp[data-theme="dark"] h6 {
-        color: #FFFFFF !important;
-        font-weight: bold !important;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.8) !important;
-    }
-    
-    .stApp[data-theme="dark"] .stMarkdown {
-        color: #E0E0E0 !important;
-    }
-    
-    
-    .stApp[data-theme="dark"] .stAlert {
-        color: #E0E0E0 !important;
-    }
-    
-    .stApp[data-theme="dark"] .stInfo {
-        background-color: #1A3A4A !important;
-        color: #E0E0E0 !important;
-    }
-    
-    .stApp[data-theme="dark"] .stSuccess {
-        background-color: #1A4A2A !important;
-        color: #E0E0E0 !important;
-    }
-    
-    .stApp[data-theme="dark"] .stWarning {
-        background-color: #4A2A1A !important;
-        color: #E0E0E0 !important;
-    }
-    
-    .stApp[data-theme="dark"] .stError {
-        background-color: #4A1A1A !important;
-        color: #E0E0E0 !important;
-    }
-    
-    /* Ensure light mode text remains readable */
-    .stApp[data-theme="light"] h1, 
-    .stApp[data-theme="light"] h2, 
-    .stApp[data-theme="light"] h3, 
-    .stApp[data-theme="light"] h4, 
-    .stApp[data-theme="light"] h5, 
-    .stApp[data-theme="light"] h6 {
-        color: #262730 !important;
-    }
-    
-    .stApp[data-theme="light"] .stMarkdown {
-        color: #262730 !important;
-    }
-    
-    .stApp[data-theme="light"] .stAlert {
-        color: #262730 !important;
-    }
-    
-    /* Sidebar text readability */
-    .stApp[data-theme="dark"] .css-1d391kg {
-        color: #E0E0E0 !important;
-    }
-    .stApp[data-theme="dark"] .stSelectbox label {
-        color: #E0E0E0 !important;
-    }
-    .stApp[data-theme="dark"] .stMarkdown p {
-        color: #E0E0E0 !important;
-    }
-    
-    .stApp[data-theme="light"] .css-1d391kg {
-        color: #262730 !important;
-    }
-    .stApp[data-theme="light"] .stSelectbox label {
-        color: #262730 !important;
-    }
-    .stApp[data-theme="light"] .stMarkdown p {
-        color: #262730 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling with proper light/dark mode support.
+# The stylesheet is served from ./static so the browser fetches and caches it once; this needs
+# a Streamlit whose static handler sends .css as text/css (see the floor in requirements.txt).
+st.markdown('<link rel="stylesheet" href="app/static/shiftwise.css">', unsafe_allow_html=True)
 
 @st.cache_data
 def load_sample_data():
     """Load sample data with caching."""
-    try:
-        # Try to load existing data
-        employees_df = pd.read_csv("sample_data/employees.csv")
-        demand_df = pd.read_csv("sample_data/demand_forecast.csv")
-        availability_df = pd.read_csv("sample_data/staff_data.csv")
-        
-        # Convert date columns
-        demand_df['Date'] = pd.to_datetime(demand_df['Date'])
-        availability_df['Date'] = pd.to_datetime(availability_df['Date'])
-        
+    if sample_data_is_current():
+        # Parquet keeps native timestamps and dtypes, so no date parsing is needed
+        employees_df, demand_df, availability_df = (
+            pd.read_parquet(os.path.join("sample_data", name), engine='pyarrow')
+            for name in SAMPLE_DATA_FILES
+        )
         return employees_df, demand_df, availability_df
+    
+    # The shipped CSV files are the canonical dataset, so a missing or stale Parquet copy is
+    # rebuilt from them; saving it means later boots take the Parquet path above
+    try:
+        employees_df, demand_df, availability_df = load_legacy_csv()
     except FileNotFoundError:
-        # Generate new data if files don't exist
+        # Generate new data only when there is no shipped dataset to convert
         st.info("Generating sample data...")
         employees_df, demand_df, availability_df = create_sample_dataset()
-        save_sample_data(employees_df, demand_df, availability_df)
-        return employees_df, demand_df, availability_df
+    
+    save_sample_data(employees_df, demand_df, availability_df)
+    return employees_df, demand_df, availability_df
+
+@st.cache_data
+def compute_global_kpis(employees_df, demand_df, availability_df):
+    """Compute the headline KPIs shown on the Global Insights page."""
+    return {
+        'total_employees': len(employees_df),
+        'avg_demand': demand_df['ForecastedDemand'].mean(),
+        'total_available_hours': availability_df['HoursAvailable'].sum(),
+        'avg_hourly_wage': availability_df['HourlyWage'].mean()
+    }
+
+@st.cache_data
+def compute_staff_coverage(availability_df):
+    """Total available hours per date with the equivalent customer coverage."""
+    dates = availability_df['Date']
+    hours = availability_df['HoursAvailable'].to_numpy()
+    
+    # Generated data is already sorted by Date; legacy CSV data needs one stable sort
+    if not dates.is_monotonic_increasing:
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        dates = dates.iloc[order]
+        hours = hours[order]
+    
+    # Sum each contiguous run of equal dates, accumulating in int64
+    codes, uniques = pd.factorize(dates, sort=True)
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    totals = np.add.reduceat(hours, starts, dtype=np.int64)
+    
+    staff_coverage_df = pd.DataFrame({'Date': uniques, 'HoursAvailable': totals})
+    staff_coverage_df['StaffCoverage'] = staff_coverage_df['HoursAvailable'] * 10  # 1 hour covers 10 customers
+    return staff_coverage_df
+
+@st.cache_data
+def compute_role_counts(employees_df):
+    """Number of employees per role."""
+    roles = employees_df['Role'].cat
+    counts = np.bincount(roles.codes, minlength=len(roles.categories))
+    return pd.Series(counts, index=roles.categories.rename('Role'), name='count')
+
+@st.cache_data
+def weekly_avg_demand(demand_df):
+    """Average forecasted demand per day of week."""
+    days = demand_df['DayOfWeek'].cat
+    num_days = len(days.categories)
+    
+    # Accumulate on the category codes, which are already in weekday order
+    totals = np.bincount(days.codes, weights=demand_df['ForecastedDemand'], minlength=num_days)
+    counts = np.bincount(days.codes, minlength=num_days)
+    observed = counts > 0
+    
+    return pd.DataFrame({
+        'DayOfWeek': days.categories[observed],
+        'ForecastedDemand': totals[observed] / counts[observed]
+    })
+
+def scale_demand(demand_df, multiplier):
+    """Return demand_df with ForecastedDemand scaled, sharing all other columns."""
+    scaled = (demand_df['ForecastedDemand'].to_numpy() * multiplier).astype(np.int32)
+    return demand_df.assign(ForecastedDemand=scaled)
+
+def optimization_cache_key(availability_df, demand_df, time_limit=30):
+    """Content-based key identifying one optimizer run."""
+    return (
+        int(pd.util.hash_pandas_object(availability_df).sum()),
+        int(pd.util.hash_pandas_object(demand_df).sum()),
+        time_limit
+    )
 
 def main():
     """Main application function."""
@@ -239,10 +158,11 @@ def show_global_insights(employees_df, demand_df, availability_df):
     st.markdown('<h2 class="section-header">📈 Global Insights</h2>', unsafe_allow_html=True)
     
     # Calculate basic KPIs
-    total_employees = len(employees_df)
-    avg_demand = demand_df['ForecastedDemand'].mean()
-    total_available_hours = availability_df['HoursAvailable'].sum()
-    avg_hourly_wage = availability_df['HourlyWage'].mean()
+    kpis = compute_global_kpis(employees_df, demand_df, availability_df)
+    total_employees = kpis['total_employees']
+    avg_demand = kpis['avg_demand']
+    total_available_hours = kpis['total_available_hours']
+    avg_hourly_wage = kpis['avg_hourly_wage']
     
     # KPI Cards
     col1, col2, col3, col4 = st.columns(4)
@@ -279,17 +199,15 @@ def show_global_insights(employees_df, demand_df, availability_df):
     st.markdown('<h3 class="section-header">Demand vs Staff Coverage</h3>', unsafe_allow_html=True)
     
     # Create a simple staff coverage estimate
-    staff_coverage_df = availability_df.groupby('Date')['HoursAvailable'].sum().reset_index()
-    staff_coverage_df['StaffCoverage'] = staff_coverage_df['HoursAvailable'] * 10  # 1 hour covers 10 customers
+    staff_coverage_df = compute_staff_coverage(availability_df)
     
     # Create a mock schedule dataframe for the chart function
-    mock_schedule_df = staff_coverage_df.copy()
-    mock_schedule_df['HoursWorked'] = staff_coverage_df['HoursAvailable']
+    mock_schedule_df = staff_coverage_df.assign(HoursWorked=staff_coverage_df['HoursAvailable'])
     
     try:
         fig = create_demand_vs_staff_chart(demand_df, mock_schedule_df)
         if fig:
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, theme=None)
     except Exception as e:
         st.error(f"Error creating chart: {str(e)}")
     
@@ -305,7 +223,7 @@ def show_global_insights(employees_df, demand_df, availability_df):
     # Employee role distribution
     st.markdown('<h3 class="section-header">Employee Role Distribution</h3>', unsafe_allow_html=True)
     
-    role_counts = employees_df['Role'].value_counts()
+    role_counts = compute_role_counts(employees_df)
     fig = px.pie(
         values=role_counts.values,
         names=role_counts.index,
@@ -317,13 +235,7 @@ def show_global_insights(employees_df, demand_df, availability_df):
     # Weekly demand patterns
     st.markdown('<h3 class="section-header">Weekly Demand Patterns</h3>', unsafe_allow_html=True)
     
-    demand_df['DayOfWeek'] = pd.Categorical(
-        demand_df['DayOfWeek'], 
-        categories=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
-        ordered=True
-    )
-    
-    weekly_avg = demand_df.groupby('DayOfWeek', observed=True)['ForecastedDemand'].mean().reset_index()
+    weekly_avg = weekly_avg_demand(demand_df)
     
     fig = px.bar(
         weekly_avg,
@@ -356,8 +268,7 @@ def show_schedule_optimizer(employees_df, demand_df, availability_df):
         
         # Demand adjustment
         demand_multiplier = st.slider("Demand Multiplier", 0.5, 2.0, 1.0, 0.1)
-        adjusted_demand_df = demand_df.copy()
-        adjusted_demand_df['ForecastedDemand'] = (adjusted_demand_df['ForecastedDemand'] * demand_multiplier).astype(int)
+        adjusted_demand_df = scale_demand(demand_df, demand_multiplier)
     
     with col2:
         st.subheader("Current Data Summary")
@@ -367,9 +278,20 @@ def show_schedule_optimizer(employees_df, demand_df, availability_df):
         st.write(f"**Total Available Hours:** {availability_df['HoursAvailable'].sum():,}")
     
     # Run optimization
-    if st.button("🚀 Optimize Schedule", type="primary"):
-        with st.spinner("Running optimization algorithm..."):
-            schedule_df, kpis, solution_info = optimize_workforce_schedule(availability_df, adjusted_demand_df)
+    # The last result is kept in the session so it stays on screen across reruns with the same
+    # inputs; anything else needs a button press, even if the shared solver cache has it
+    cache_key = optimization_cache_key(availability_df, adjusted_demand_df, time_limit)
+    last_result = st.session_state.get('optimizer_result')
+    has_last_result = last_result is not None and last_result[0] == cache_key
+    run_clicked = st.button("🚀 Optimize Schedule", type="primary")
+    if run_clicked or has_last_result:
+        if run_clicked:
+            with st.spinner("Running optimization algorithm..."):
+                result = optimize_workforce_schedule(
+                    availability_df, adjusted_demand_df, time_limit_seconds=time_limit
+                )
+            st.session_state.optimizer_result = (cache_key, result)
+        schedule_df, kpis, solution_info = st.session_state.optimizer_result[1]
         
         if not schedule_df.empty:
             st.success("✅ Optimization completed successfully!")
@@ -383,11 +305,11 @@ def show_schedule_optimizer(employees_df, demand_df, availability_df):
             
             with col1:
                 fig = create_cost_breakdown_chart(schedule_df)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True, theme=None)
             
             with col2:
                 fig = create_weekly_hours_chart(schedule_df)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True, theme=None)
             
             # Schedule table
             st.markdown('<h3 class="section-header">Optimized Schedule</h3>', unsafe_allow_html=True)
@@ -401,16 +323,14 @@ def show_schedule_optimizer(employees_df, demand_df, availability_df):
             with col3:
                 min_hours = st.number_input("Minimum Hours", min_value=0, value=0)
             
-            # Apply filters
-            filtered_df = schedule_df.copy()
+            # Apply filters as one boolean mask over the underlying arrays
+            mask = schedule_df['HoursWorked'].to_numpy() >= min_hours
             if selected_role != "All":
-                filtered_df = filtered_df[filtered_df['Role'] == selected_role]
+                mask &= schedule_df['Role'].to_numpy() == selected_role
             if len(date_range) == 2:
-                filtered_df = filtered_df[
-                    (filtered_df['Date'] >= pd.to_datetime(date_range[0])) &
-                    (filtered_df['Date'] <= pd.to_datetime(date_range[1]))
-                ]
-            filtered_df = filtered_df[filtered_df['HoursWorked'] >= min_hours]
+                dates = schedule_df['Date'].to_numpy()
+                mask &= (dates >= np.datetime64(date_range[0])) & (dates <= np.datetime64(date_range[1]))
+            filtered_df = schedule_df.loc[mask]
             
             st.dataframe(
                 filtered_df,
@@ -446,6 +366,9 @@ def show_scenario_explorer(employees_df, demand_df, availability_df):
     </div>
     """, unsafe_allow_html=True)
     
+    # Employee IDs shared by the absence and reduction widgets
+    emp_ids = employees_df['EmployeeID'].tolist()
+    
     # Scenario selection
     scenario_type = st.selectbox(
         "Select Scenario:",
@@ -471,37 +394,33 @@ def show_scenario_explorer(employees_df, demand_df, availability_df):
     
     if scenario_type == "Demand Spike (+20%)":
         spike_percentage = st.slider("Demand Increase (%)", 10, 50, 20)
-        scenario_demand_df = demand_df.copy()
-        scenario_demand_df['ForecastedDemand'] = (scenario_demand_df['ForecastedDemand'] * (1 + spike_percentage/100)).astype(int)
+        scenario_demand_df = scale_demand(demand_df, 1 + spike_percentage/100)
         
     elif scenario_type == "Employee Absences":
         absent_employees = st.multiselect(
             "Select Absent Employees:",
-            employees_df['EmployeeID'].tolist(),
-            default=employees_df['EmployeeID'].tolist()[:2]
+            emp_ids,
+            default=emp_ids[:2]
+        )
+        absent_mask = availability_df['EmployeeID'].isin(absent_employees).to_numpy()
+        scenario_availability_df = availability_df.assign(
+            HoursAvailable=np.where(absent_mask, 0, availability_df['HoursAvailable'].to_numpy())
         )
-        scenario_availability_df = availability_df.copy()
-        scenario_availability_df.loc[
-            scenario_availability_df['EmployeeID'].isin(absent_employees), 
-            'HoursAvailable'
-        ] = 0
         
     elif scenario_type == "Holiday Season":
         holiday_multiplier = st.slider("Holiday Demand Multiplier", 1.5, 3.0, 2.0, 0.1)
-        scenario_demand_df = demand_df.copy()
-        scenario_demand_df['ForecastedDemand'] = (scenario_demand_df['ForecastedDemand'] * holiday_multiplier).astype(int)
+        scenario_demand_df = scale_demand(demand_df, holiday_multiplier)
         
     elif scenario_type == "Staff Reduction":
         reduction_percentage = st.slider("Staff Reduction (%)", 10, 40, 20)
         num_to_remove = int(len(employees_df) * reduction_percentage / 100)
         removed_employees = st.multiselect(
             "Select Employees to Remove:",
-            employees_df['EmployeeID'].tolist(),
-            default=employees_df['EmployeeID'].tolist()[:num_to_remove]
+            emp_ids,
+            default=emp_ids[:num_to_remove]
         )
-        scenario_availability_df = availability_df.copy()
-        scenario_availability_df = scenario_availability_df[
-            ~scenario_availability_df['EmployeeID'].isin(removed_employees)
+        scenario_availability_df = availability_df[
+            ~availability_df['EmployeeID'].isin(removed_employees)
         ]
     
     # Run scenario optimization
@@ -532,7 +451,7 @@ def show_scenario_explorer(employees_df, demand_df, availability_df):
                     scenario_kpis, 
                     scenario_type
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True, theme=None)
                 
                 # Calculate differences
                 cost_diff = scenario_kpis.get('total_cost', 0) - st.session_state.baseline_kpis.get('total_cost', 0)
@@ -0,0 +1,131 @@
+"""
+Compiled numeric kernels for ShiftWise.
+Kernels are JIT-compiled with Numba when it is installed; otherwise the
+equivalent NumPy implementation is used.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - depends on the environment
+    njit = None
+
+def _fill_availability_loop(pref_masks, day_masks, is_weekend, weekend_pref, is_part_time,
+                            is_supervisor, weekend_draw, absence_draw, part_time_hours,
+                            full_time_hours, out_hours, out_avail):
+    """Fill the (day, employee) availability grids one cell at a time."""
+
+    for d in range(day_masks.shape[0]):
+        for e in range(pref_masks.shape[0]):
+            # Check if employee is available on this day
+            available = (pref_masks[e] & day_masks[d]) != 0
+
+            # Weekend availability logic
+            if is_weekend[d]:
+                if weekend_pref[e]:
+                    available = available and weekend_draw[d, e] < 0.9
+                else:
+                    available = weekend_draw[d, e] < 0.3
+
+            # Random absences (sick days, personal time)
+            if available and absence_draw[d, e] < 0.05:
+                available = False
+
+            out_avail[d, e] = available
+            if available:
+                hours = part_time_hours[d, e] if is_part_time[e] else full_time_hours[d, e]
+
+                # Supervisors might work longer shifts
+                if is_supervisor[e] and hours < 8:
+                    hours = 8
+                out_hours[d, e] = hours
+            else:
+                out_hours[d, e] = 0
+
+def _fill_availability_numpy(pref_masks, day_masks, is_weekend, weekend_pref, is_part_time,
+                             is_supervisor, weekend_draw, absence_draw, part_time_hours,
+                             full_time_hours, out_hours, out_avail):
+    """Vectorized equivalent of _fill_availability_loop using broadcasting."""
+
+    is_preferred = (day_masks[:, None] & pref_masks[None, :]) != 0
+    available = np.where(
+        is_weekend[:, None],
+        np.where(weekend_pref[None, :], is_preferred & (weekend_draw < 0.9), weekend_draw < 0.3),
+        is_preferred
+    )
+    available &= absence_draw >= 0.05
+
+    hours = np.where(is_part_time[None, :], part_time_hours, full_time_hours)
+    hours = np.where(is_supervisor[None, :], np.maximum(hours, 8), hours)
+
+    out_avail[:] = available
+    out_hours[:] = np.where(available, hours, 0)
+
+def _greedy_assign_loop(hours_avail, wage, is_supervisor, demand_per_day, week_idx, weekly_cap):
+    """Assign each day's required hours to the cheapest employees with spare capacity."""
+
+    n_days, n_employees = hours_avail.shape
+    assignment = np.zeros((n_days, n_employees), dtype=np.int32)
+    if n_days == 0:
+        return assignment
+    weekly_used = np.zeros((week_idx.max() + 1, n_employees), dtype=np.int64)
+
+    for d in range(n_days):
+        week = week_idx[d]
+        remaining = max(1, demand_per_day[d] // 10)
+
+        # Cheapest employees first
+        order = np.argsort(wage[d], kind='mergesort')
+
+        # Cheapest supervisor who can cover a 4-hour minimum shift
+        for e in order:
+            if hours_avail[d, e] > 0 and is_supervisor[d, e]:
+                capacity = min(hours_avail[d, e], weekly_cap[e] - weekly_used[week, e])
+                if capacity >= 4:
+                    hours = min(capacity, max(4, remaining))
+                    assignment[d, e] = hours
+                    weekly_used[week, e] += hours
+                    remaining -= hours
+                    break
+
+        # Fill remaining demand with the cheapest remaining capacity
+        for e in order:
+            if remaining <= 0:
+                break
+            if hours_avail[d, e] <= 0 or assignment[d, e] > 0:
+                continue
+            capacity = min(hours_avail[d, e], weekly_cap[e] - weekly_used[week, e])
+            hours = min(capacity, remaining)
+            if hours > 0:
+                assignment[d, e] = hours
+                weekly_used[week, e] += hours
+                remaining -= hours
+
+    return assignment
+
+def _compute_overtime_loop(hours):
+    """Total hours beyond 8 across all shifts."""
+
+    total = 0
+    for h in hours:
+        if h > 8:
+            total += h - 8
+    return total
+
+def _compute_overtime_numpy(hours):
+    """Vectorized equivalent of _compute_overtime_loop."""
+
+    return int(np.maximum(hours - 8, 0).sum())
+
+if njit is not None:
+    # Compiled serially: the grid is small, and once a parallel kernel runs on Streamlit's
+    # script thread, Numba's threading layer keeps the process from exiting
+    fill_availability = njit(cache=True)(_fill_availability_loop)
+    greedy_assign = njit(cache=True)(_greedy_assign_loop)
+    compute_overtime = njit(cache=True)(_compute_overtime_loop)
+else:
+    fill_availability = _fill_availability_numpy
+    # The greedy pass is inherently sequential, so the fallback is the plain loop
+    greedy_assign = _greedy_assign_loop
+    compute_overtime = _compute_overtime_numpy
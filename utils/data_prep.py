@@ -3,156 +3,162 @@ Data preparation utilities for ShiftWise workforce scheduling.
 Generates synthetic but realistic staff data for demonstration purposes.
 """
 
+import ast
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 from typing import List, Dict, Tuple
 
+from utils._fast import fill_availability
+
+# Day-of-week names in weekday() order; bit i of a day mask is DAYS_OF_WEEK[i]
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+ALL_DAYS_MASK = (1 << len(DAYS_OF_WEEK)) - 1
+WEEKEND_MASK = (1 << DAYS_OF_WEEK.index('Saturday')) | (1 << DAYS_OF_WEEK.index('Sunday'))
+
+# Employee roles, in the category order used for the Role column
+ROLES = ['cashier', 'stock', 'supervisor']
+
+# Parquet files written by save_sample_data, in (employees, demand, availability) order
+SAMPLE_DATA_FILES = ('employees.parquet', 'demand_forecast.parquet', 'staff_data.parquet')
+
+# Modules whose code shapes the generated data; saved files older than any of them are stale
+_GENERATOR_SOURCES = (__file__, os.path.join(os.path.dirname(__file__), '_fast.py'))
+
+# Shared generator so a given seed reproduces the whole dataset
+_RNG = np.random.default_rng(42)
+
+def mask_to_days(mask: int) -> List[str]:
+    """Decode a day-of-week bitmask back into a list of day names."""
+    return [day for i, day in enumerate(DAYS_OF_WEEK) if mask & (1 << i)]
+
 def generate_employee_data(num_employees: int = 25) -> pd.DataFrame:
     """Generate synthetic employee data with realistic patterns."""
     
-    # Employee roles and their characteristics
+    # Employee roles and their characteristics, in ROLES order
     roles = {
-        'cashier': {'base_wage': 15.0, 'max_hours': 40, 'skill_level': 1},
-        'stock': {'base_wage': 16.0, 'max_hours': 40, 'skill_level': 2},
-        'supervisor': {'base_wage': 22.0, 'max_hours': 45, 'skill_level': 3}
+        'cashier': {'base_wage': 15.0, 'max_hours': 40, 'skill_level': 1, 'count': 12},  # More cashiers
+        'stock': {'base_wage': 16.0, 'max_hours': 40, 'skill_level': 2, 'count': 8},
+        'supervisor': {'base_wage': 22.0, 'max_hours': 45, 'skill_level': 3, 'count': 5}  # Fewer supervisors
     }
     
-    employees = []
-    employee_id = 1
-    
-    # Generate employees for each role
-    for role, config in roles.items():
-        if role == 'supervisor':
-            count = 5  # Fewer supervisors
-        elif role == 'stock':
-            count = 8
-        else:
-            count = 12  # More cashiers
-        
-        for _ in range(count):
-            # Part-time vs full-time availability
-            is_part_time = random.random() < 0.3 if role != 'supervisor' else False
-            
-            # Availability patterns
-            if is_part_time:
-                max_weekly_hours = random.randint(15, 25)
-                preferred_days = random.sample(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], 
-                                             random.randint(2, 4))
-            else:
-                max_weekly_hours = config['max_hours']
-                preferred_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            
-            # Weekend availability (some employees prefer weekends)
-            weekend_preference = random.random() < 0.4
-            
-            employee = {
-                'EmployeeID': f'EMP{employee_id:03d}',
-                'Name': f'Employee {employee_id}',
-                'Role': role,
-                'HourlyWage': config['base_wage'] + random.uniform(-1.0, 2.0),
-                'MaxWeeklyHours': max_weekly_hours,
-                'PreferredDays': preferred_days,
-                'WeekendPreference': weekend_preference,
-                'SkillLevel': config['skill_level'],
-                'IsPartTime': is_part_time
-            }
-            
-            employees.append(employee)
-            employee_id += 1
-    
-    return pd.DataFrame(employees)
+    # Per-role lookups indexed by role code
+    base_wage = np.array([roles[role]['base_wage'] for role in ROLES])
+    max_hours = np.array([roles[role]['max_hours'] for role in ROLES])
+    skill_level = np.array([roles[role]['skill_level'] for role in ROLES])
+    
+    role_codes = np.repeat(np.arange(len(ROLES)), [roles[role]['count'] for role in ROLES])
+    n = len(role_codes)
+    
+    # Part-time vs full-time availability (supervisors are always full-time)
+    is_part_time = (_RNG.random(n) < 0.3) & (role_codes != ROLES.index('supervisor'))
+    
+    # Availability patterns
+    max_weekly_hours = np.where(is_part_time, _RNG.integers(15, 26, n), max_hours[role_codes])
+    
+    # Part-timers prefer 2-4 random days: keep the lowest-ranked days of a random permutation
+    day_ranks = _RNG.random((n, len(DAYS_OF_WEEK))).argsort(axis=1).argsort(axis=1)
+    num_preferred = _RNG.integers(2, 5, n)
+    day_bits = np.left_shift(1, np.arange(len(DAYS_OF_WEEK)))
+    sampled_mask = ((day_ranks < num_preferred[:, None]) * day_bits).sum(axis=1)
+    preferred_days_mask = np.where(is_part_time, sampled_mask, ALL_DAYS_MASK)
+    
+    # Weekend availability (some employees prefer weekends)
+    weekend_preference = _RNG.random(n) < 0.4
+    
+    employee_ids = np.arange(1, n + 1)
+    
+    return pd.DataFrame({
+        'EmployeeID': [f'EMP{i:03d}' for i in employee_ids],
+        'Name': [f'Employee {i}' for i in employee_ids],
+        'Role': pd.Categorical.from_codes(role_codes, categories=ROLES),
+        'HourlyWage': base_wage[role_codes] + _RNG.uniform(-1.0, 2.0, n),
+        'MaxWeeklyHours': max_weekly_hours,
+        'PreferredDaysMask': preferred_days_mask.astype(np.uint8),
+        'WeekendPreference': weekend_preference,
+        'SkillLevel': skill_level[role_codes],
+        'IsPartTime': is_part_time
+    })
 
 def generate_demand_forecast(start_date: datetime, num_days: int = 90) -> pd.DataFrame:
     """Generate synthetic demand forecast with realistic patterns."""
     
-    dates = []
-    day_of_weeks = []
-    forecasted_demands = []
-    
-    for i in range(num_days):
-        current_date = start_date + timedelta(days=i)
-        day_of_week = current_date.strftime('%A')
-        
-        # Base demand patterns
-        base_demand = 100
-        
-        # Weekend effect (higher demand)
-        if day_of_week in ['Saturday', 'Sunday']:
-            weekend_multiplier = random.uniform(1.3, 1.8)
-        else:
-            weekend_multiplier = random.uniform(0.8, 1.2)
-        
-        # Seasonal variation (simulate some seasonality)
-        seasonal_factor = 1 + 0.2 * np.sin(2 * np.pi * i / 365)
-        
-        # Random variation
-        random_factor = random.uniform(0.8, 1.2)
-        
-        # Calculate final demand
-        demand = int(base_demand * weekend_multiplier * seasonal_factor * random_factor)
-        
-        dates.append(current_date)
-        day_of_weeks.append(day_of_week)
-        forecasted_demands.append(demand)
+    idx = np.arange(num_days)
+    dates = pd.date_range(start_date, periods=num_days)
+    day_index = dates.dayofweek.to_numpy().astype(np.int8)  # Monday=0 .. Sunday=6
+    day_mask = np.left_shift(1, day_index).astype(np.uint8)
+    is_weekend = day_index >= DAYS_OF_WEEK.index('Saturday')
+    
+    # Base demand patterns
+    base_demand = 100
+    
+    # Weekend effect (higher demand)
+    weekend_multiplier = np.where(
+        is_weekend,
+        _RNG.uniform(1.3, 1.8, num_days),
+        _RNG.uniform(0.8, 1.2, num_days)
+    )
+    
+    # Seasonal variation (simulate some seasonality)
+    seasonal_factor = 1 + 0.2 * np.sin(2 * np.pi * idx / 365)
+    
+    # Random variation
+    random_factor = _RNG.uniform(0.8, 1.2, num_days)
+    
+    # Calculate final demand
+    demand = (base_demand * weekend_multiplier * seasonal_factor * random_factor).astype(np.uint16)
     
     return pd.DataFrame({
         'Date': dates,
-        'DayOfWeek': day_of_weeks,
-        'ForecastedDemand': forecasted_demands
+        'DayOfWeek': pd.Categorical.from_codes(day_index, categories=DAYS_OF_WEEK, ordered=True),
+        'DayMask': day_mask,
+        'ForecastedDemand': demand
     })
 
 def generate_availability_data(employees_df: pd.DataFrame, demand_df: pd.DataFrame) -> pd.DataFrame:
     """Generate daily availability data for each employee."""
     
-    availability_records = []
-    
-    for _, employee in employees_df.iterrows():
-        for _, day in demand_df.iterrows():
-            date = day['Date']
-            day_of_week = day['DayOfWeek']
-            
-            # Check if employee is available on this day
-            is_available = day_of_week in employee['PreferredDays']
-            
-            # Weekend availability logic
-            if day_of_week in ['Saturday', 'Sunday']:
-                if not employee['WeekendPreference']:
-                    is_available = random.random() < 0.3  # 30% chance even if not preferred
-                else:
-                    is_available = is_available and random.random() < 0.9  # 90% chance if preferred
-            
-            # Random absences (sick days, personal time)
-            if is_available and random.random() < 0.05:  # 5% chance of absence
-                is_available = False
-            
-            if is_available:
-                # Determine hours available for this day
-                if employee['IsPartTime']:
-                    hours_available = random.choice([4, 6, 8])
-                else:
-                    hours_available = random.choice([6, 8, 10])
-                
-                # Supervisors might work longer shifts
-                if employee['Role'] == 'supervisor':
-                    hours_available = max(hours_available, 8)
-            else:
-                hours_available = 0
-            
-            availability_records.append({
-                'Date': date,
-                'DayOfWeek': day_of_week,
-                'EmployeeID': employee['EmployeeID'],
-                'Name': employee['Name'],
-                'Role': employee['Role'],
-                'HourlyWage': employee['HourlyWage'],
-                'MaxWeeklyHours': employee['MaxWeeklyHours'],
-                'HoursAvailable': hours_available,
-                'IsAvailable': is_available
-            })
-    
-    return pd.DataFrame(availability_records)
+    shape = (len(demand_df), len(employees_df))
+    
+    # Day-level and employee-level inputs as contiguous arrays
+    day_masks = demand_df['DayMask'].to_numpy(dtype=np.uint8)
+    is_weekend = (day_masks & WEEKEND_MASK) != 0
+    pref_masks = employees_df['PreferredDaysMask'].to_numpy(dtype=np.uint8)
+    weekend_pref = employees_df['WeekendPreference'].to_numpy(dtype=bool)
+    is_part_time = employees_df['IsPartTime'].to_numpy(dtype=bool)
+    is_supervisor = (employees_df['Role'] == 'supervisor').to_numpy()
+    
+    # Draw every random number up front so the kernel stays purely numeric
+    weekend_draw = _RNG.random(shape)
+    absence_draw = _RNG.random(shape)
+    part_time_hours = _RNG.choice(np.array([4, 6, 8], dtype=np.uint8), size=shape)
+    full_time_hours = _RNG.choice(np.array([6, 8, 10], dtype=np.uint8), size=shape)
+    
+    hours_available = np.empty(shape, dtype=np.uint8)
+    is_available = np.empty(shape, dtype=bool)
+    fill_availability(
+        pref_masks, day_masks, is_weekend, weekend_pref, is_part_time, is_supervisor,
+        weekend_draw, absence_draw, part_time_hours, full_time_hours,
+        hours_available, is_available
+    )
+    
+    # One row per (day, employee); days in the outer position keep the frame sorted by Date
+    day_idx = np.repeat(np.arange(shape[0]), shape[1])
+    emp_idx = np.tile(np.arange(shape[1]), shape[0])
+    
+    return pd.DataFrame({
+        'Date': demand_df['Date'].array.take(day_idx),
+        'DayOfWeek': demand_df['DayOfWeek'].array.take(day_idx),
+        'EmployeeID': employees_df['EmployeeID'].array.take(emp_idx),
+        'Name': employees_df['Name'].array.take(emp_idx),
+        'Role': employees_df['Role'].array.take(emp_idx),
+        # Narrow numeric dtypes: hours fit in uint8 and wages need no float64 precision
+        'HourlyWage': employees_df['HourlyWage'].to_numpy(dtype=np.float32)[emp_idx],
+        'MaxWeeklyHours': employees_df['MaxWeeklyHours'].to_numpy(dtype=np.uint8)[emp_idx],
+        'HoursAvailable': hours_available.ravel(),
+        'IsAvailable': is_available.ravel()
+    }, copy=False)
 
 def create_sample_dataset() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """Create the complete sample dataset for ShiftWise."""
@@ -169,22 +175,76 @@ def create_sample_dataset() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     
     return employees_df, demand_df, availability_df
 
+def load_legacy_csv(input_dir: str = "sample_data") -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Load the CSV sample data written by earlier versions, converted to the generated schema."""
+    
+    employees_df = pd.read_csv(os.path.join(input_dir, "employees.csv"))
+    demand_df = pd.read_csv(os.path.join(input_dir, "demand_forecast.csv"), parse_dates=['Date'])
+    availability_df = pd.read_csv(os.path.join(input_dir, "staff_data.csv"), parse_dates=['Date'])
+    
+    # Restore the categorical dtypes produced at generation time
+    for df in (employees_df, availability_df):
+        df['Role'] = pd.Categorical(df['Role'], categories=ROLES)
+    for df in (demand_df, availability_df):
+        df['DayOfWeek'] = pd.Categorical(df['DayOfWeek'], categories=DAYS_OF_WEEK, ordered=True)
+    
+    # Preferred days were stored as a list repr such as "['Monday', 'Friday']"; rebuild the mask
+    loc = employees_df.columns.get_loc('PreferredDays')
+    preferred_days = employees_df.pop('PreferredDays')
+    employees_df.insert(loc, 'PreferredDaysMask', np.array([
+        sum(1 << DAYS_OF_WEEK.index(day) for day in ast.literal_eval(days)) for days in preferred_days
+    ], dtype=np.uint8))
+    
+    day_index = demand_df['DayOfWeek'].cat.codes.to_numpy()
+    demand_df.insert(demand_df.columns.get_loc('DayOfWeek') + 1, 'DayMask',
+                     np.left_shift(1, day_index).astype(np.uint8))
+    demand_df['ForecastedDemand'] = demand_df['ForecastedDemand'].astype(np.uint16)
+    
+    availability_df = availability_df.astype({
+        'HourlyWage': np.float32,
+        'MaxWeeklyHours': np.uint8,
+        'HoursAvailable': np.uint8
+    })
+    
+    return employees_df, demand_df, availability_df
+
+def sample_data_is_current(output_dir: str = "sample_data") -> bool:
+    """Check that every saved Parquet file exists and is newer than the generator code."""
+    
+    paths = [os.path.join(output_dir, name) for name in SAMPLE_DATA_FILES]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    
+    # A leftover temporary file means a save was interrupted and the set may be mixed
+    if any(os.path.exists(path + '.tmp') for path in paths):
+        return False
+    
+    source_mtime = max(os.path.getmtime(source) for source in _GENERATOR_SOURCES)
+    return all(os.path.getmtime(path) > source_mtime for path in paths)
+
 def save_sample_data(employees_df: pd.DataFrame, demand_df: pd.DataFrame, 
                     availability_df: pd.DataFrame, output_dir: str = "sample_data"):
-    """Save the generated data to CSV files."""
+    """Save the generated data to Parquet files."""
     
-    import os
     os.makedirs(output_dir, exist_ok=True)
     
-    # Save individual datasets
-    employees_df.to_csv(f"{output_dir}/employees.csv", index=False)
-    demand_df.to_csv(f"{output_dir}/demand_forecast.csv", index=False)
-    availability_df.to_csv(f"{output_dir}/staff_data.csv", index=False)
+    # Spell out preferred days for readability; the mask remains the source of truth
+    employees_df = employees_df.assign(
+        PreferredDays=[mask_to_days(mask) for mask in employees_df['PreferredDaysMask']]
+    )
+    
+    # Write every file to a temporary path before swapping any in, so readers never see a
+    # partial file and an interrupted save leaves .tmp files that mark the set as stale
+    paths = [os.path.join(output_dir, name) for name in SAMPLE_DATA_FILES]
+    for df, path in zip((employees_df, demand_df, availability_df), paths):
+        df.to_parquet(path + '.tmp', engine='pyarrow', compression='zstd', index=False)
+    for path in paths:
+        os.replace(path + '.tmp', path)
     
     print(f"Data saved to {output_dir}/")
-    print(f"- employees.csv: {len(employees_df)} employees")
-    print(f"- demand_forecast.csv: {len(demand_df)} days of demand data")
-    print(f"- staff_data.csv: {len(availability_df)} availability records")
+    print(f"- employees.parquet: {len(employees_df)} employees")
+    print(f"- demand_forecast.parquet: {len(demand_df)} days of demand data")
+    print(f"- staff_data.parquet: {len(availability_df)} availability records")
 
 if __name__ == "__main__":
     # Generate and save sample data
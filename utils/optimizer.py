@@ -3,146 +3,248 @@ Workforce scheduling optimization using OR-Tools.
 Implements constraint programming to minimize labor costs while meeting demand.
 """
 
+import os
+from collections import defaultdict
+
 import pandas as pd
 import numpy as np
 from ortools.sat.python import cp_model
 from typing import Dict, List, Tuple, Optional
 import streamlit as st
 
+from utils._fast import compute_overtime, greedy_assign
+
+def _available_cpus() -> int:
+    """CPUs this process may run on, which in containers can be fewer than os.cpu_count()."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity is not available on every platform
+        return os.cpu_count() or 1
+
+# CP-SAT parameters applied to every solve; entries passed via solver_params override these.
+# Workers are capped so concurrent Streamlit sessions don't each claim every CPU
+DEFAULT_SOLVER_PARAMS = {
+    'num_workers': min(_available_cpus(), 8),
+    'linearization_level': 2,
+    'cp_model_presolve': True,
+    'symmetry_level': 2  # Employees are largely interchangeable within a role and wage band
+}
+
 class WorkforceOptimizer:
     """Optimizer for workforce scheduling with cost minimization objective."""
     
     def __init__(self, availability_df: pd.DataFrame, demand_df: pd.DataFrame):
         self.availability_df = availability_df
         self.demand_df = demand_df
-        self.model = None
         self.variables = {}
         self.solution = None
+        self._data_cache = None
         
     def prepare_data(self) -> Dict:
         """Prepare data for optimization."""
         
+        # The input frames don't change after construction, so build the lookups once
+        if self._data_cache is not None:
+            return self._data_cache
+        
         # Get unique dates and employees
         dates = sorted(self.availability_df['Date'].unique())
         employees = self.availability_df['EmployeeID'].unique()
         
-        # Create demand lookup
-        demand_lookup = dict(zip(self.demand_df['Date'], self.demand_df['ForecastedDemand']))
-        
-        # Create availability matrix
-        availability_matrix = {}
-        wage_matrix = {}
-        role_matrix = {}
-        
-        for _, row in self.availability_df.iterrows():
-            key = (row['Date'], row['EmployeeID'])
-            availability_matrix[key] = row['HoursAvailable']
-            wage_matrix[key] = row['HourlyWage']
-            role_matrix[key] = row['Role']
-        
-        return {
+        # Integer positions used to index the (date, employee) grids below
+        date_idx = {date: i for i, date in enumerate(dates)}
+        emp_idx = {employee: i for i, employee in enumerate(employees)}
+        
+        # Demand per date as a contiguous array aligned with dates (0 where no forecast exists)
+        demand_array = (
+            self.demand_df.set_index('Date')['ForecastedDemand']
+            .reindex(dates)
+            .fillna(0)
+            .to_numpy()
+            .astype(np.int64)
+        )
+        
+        # Week number of each date, so weekly caps can be applied per (employee, week)
+        date_index = pd.DatetimeIndex(dates)
+        week_idx = pd.factorize(date_index - pd.to_timedelta(date_index.weekday, unit='D'))[0]
+        
+        # (date, employee) grids; cells without an availability row stay at 0 / None.
+        # The index cast matters for an empty frame, where map() yields float64
+        d_idx = self.availability_df['Date'].map(date_idx).to_numpy().astype(np.intp)
+        e_idx = self.availability_df['EmployeeID'].map(emp_idx).to_numpy().astype(np.intp)
+        hours_avail = np.zeros((len(dates), len(employees)), dtype=np.int32)
+        wage = np.zeros(hours_avail.shape, dtype=np.float64)
+        role = np.empty(hours_avail.shape, dtype=object)
+        hours_avail[d_idx, e_idx] = self.availability_df['HoursAvailable'].to_numpy()
+        wage[d_idx, e_idx] = self.availability_df['HourlyWage'].to_numpy()
+        role[d_idx, e_idx] = self.availability_df['Role'].to_numpy()
+        
+        # Weekly hour cap per employee, aligned with employees
+        max_weekly_hours = (
+            self.availability_df.groupby('EmployeeID', observed=True)['MaxWeeklyHours'].first()
+            .reindex(employees)
+            .to_numpy()
+            .astype(np.int64)
+        )
+        
+        self._data_cache = {
             'dates': dates,
             'employees': employees,
-            'demand_lookup': demand_lookup,
-            'availability_matrix': availability_matrix,
-            'wage_matrix': wage_matrix,
-            'role_matrix': role_matrix
+            'date_idx': date_idx,
+            'emp_idx': emp_idx,
+            'week_idx': week_idx,
+            'demand_array': demand_array,
+            'hours_avail': hours_avail,
+            'wage': wage,
+            'role': role,
+            'max_weekly_hours': max_weekly_hours
         }
+        return self._data_cache
     
-    def build_model(self, data: Dict) -> cp_model.CpModel:
-        """Build the constraint programming model."""
+    def build_model(self, data: Dict, break_symmetry: bool = False) -> cp_model.CpModel:
+        """Build the constraint programming model.
         
-        model = cp_model.CpModel()
+        break_symmetry adds ordering constraints between interchangeable employees. It is off
+        by default because the generated data (per-employee wages and 90-day availability)
+        has no two identical employees, so it would only add model-building work.
+        """
         
-        dates = data['dates']
-        employees = data['employees']
-        demand_lookup = data['demand_lookup']
-        availability_matrix = data['availability_matrix']
-        wage_matrix = data['wage_matrix']
-        role_matrix = data['role_matrix']
+        model = cp_model.CpModel()
         
-        # Decision variables: x[date, employee] = hours worked
-        variables = {}
-        for date in dates:
-            for employee in employees:
-                key = (date, employee)
-                if key in availability_matrix and availability_matrix[key] > 0:
-                    max_hours = availability_matrix[key]
-                    variables[key] = model.NewIntVar(0, max_hours, f'hours_{date}_{employee}')
+        hours_avail = data['hours_avail']
+        week_idx = data['week_idx'].tolist()
         
-        # Objective: minimize total labor cost
-        total_cost = []
-        for (date, employee), var in variables.items():
-            wage = wage_matrix[(date, employee)]
-            total_cost.append(var * wage)
+        # Only (date, employee) cells with availability get a variable
+        d_active, e_active = np.nonzero(hours_avail)
+        is_supervisor = data['role'][d_active, e_active] == 'supervisor'
         
-        model.Minimize(sum(total_cost))
+        # Decision variables: x[d, e] = hours worked, bucketed for each constraint family
+        variables = {}
+        vars_by_date = defaultdict(list)
+        supervisors_by_date = defaultdict(list)
+        vars_by_emp_week = defaultdict(list)
+        cost_vars = []
+        
+        for d, e, max_hours, supervisor in zip(
+            d_active.tolist(), e_active.tolist(), hours_avail[d_active, e_active].tolist(),
+            is_supervisor.tolist()
+        ):
+            var = model.NewIntVar(0, max_hours, f'hours_{d}_{e}')
+            variables[(d, e)] = var
+            cost_vars.append(var)
+            vars_by_date[d].append(var)
+            if supervisor:
+                supervisors_by_date[d].append(var)
+            vars_by_emp_week[(e, week_idx[d])].append(var)
+        
+        # Objective: minimize total labor cost as one flat weighted sum
+        cost_weights = data['wage'][d_active, e_active].tolist()
+        model.Minimize(cp_model.LinearExpr.WeightedSum(cost_vars, cost_weights))
         
         # Constraints
         
         # 1. Meet demand constraint (simplified: assume 1 hour of work covers 10 customers)
-        for date in dates:
-            demand = demand_lookup.get(date, 0)
+        for d, demand in enumerate(data['demand_array'].tolist()):
             required_hours = max(1, demand // 10)  # At least 1 hour, then 1 hour per 10 customers
             
-            available_employees = [var for (d, emp), var in variables.items() if d == date]
+            available_employees = vars_by_date.get(d)
             if available_employees:
-                model.Add(sum(available_employees) >= required_hours)
+                model.Add(cp_model.LinearExpr.Sum(available_employees) >= required_hours)
         
         # 2. Supervisor constraint: at least one supervisor per day
-        for date in dates:
-            supervisor_vars = []
-            for employee in employees:
-                key = (date, employee)
-                if key in variables and role_matrix.get(key) == 'supervisor':
-                    supervisor_vars.append(variables[key])
-            
-            if supervisor_vars:
-                # At least one supervisor must work at least 4 hours
-                supervisor_working = []
-                for var in supervisor_vars:
-                    working = model.NewBoolVar(f'supervisor_working_{date}_{var}')
-                    model.Add(var >= 4).OnlyEnforceIf(working)
-                    model.Add(var == 0).OnlyEnforceIf(working.Not())
-                    supervisor_working.append(working)
-                
-                model.Add(sum(supervisor_working) >= 1)
+        for d, supervisor_vars in supervisors_by_date.items():
+            # At least one supervisor must work at least 4 hours: the longest supervisor shift is >= 4
+            max_supervisor_hours = model.NewIntVar(0, int(hours_avail[d].max()), f'max_supervisor_hours_{d}')
+            model.AddMaxEquality(max_supervisor_hours, supervisor_vars)
+            model.Add(max_supervisor_hours >= 4)
         
         # 3. Weekly hours constraint
-        for employee in employees:
-            # Get employee's max weekly hours
-            emp_data = self.availability_df[self.availability_df['EmployeeID'] == employee].iloc[0]
-            max_weekly_hours = emp_data['MaxWeeklyHours']
-            
-            # Group dates by week
-            weekly_hours = {}
-            for date in dates:
-                week_start = date - pd.Timedelta(days=date.weekday())
-                if week_start not in weekly_hours:
-                    weekly_hours[week_start] = []
-                
-                key = (date, employee)
-                if key in variables:
-                    weekly_hours[week_start].append(variables[key])
-            
-            # Add weekly constraint for each week
-            for week_start, week_vars in weekly_hours.items():
-                if week_vars:
-                    model.Add(sum(week_vars) <= max_weekly_hours)
+        max_weekly_hours = data['max_weekly_hours'].tolist()
+        for (e, _), week_vars in vars_by_emp_week.items():
+            model.Add(cp_model.LinearExpr.Sum(week_vars) <= max_weekly_hours[e])
         
         # 4. Availability constraint (already handled by variable bounds)
         
+        # 5. Order interchangeable employees so the solver skips permuted copies of a schedule
+        if break_symmetry:
+            self._add_symmetry_breaking(model, data, variables)
+        
         self.variables = variables
         return model
     
-    def solve(self, time_limit_seconds: int = 30) -> Dict:
-        """Solve the optimization problem."""
+    def _add_symmetry_breaking(self, model: cp_model.CpModel, data: Dict, variables: Dict) -> None:
+        """Add ordering constraints between employees with identical profiles."""
+        
+        hours_avail = data['hours_avail']
+        
+        # Role and wage per employee, taken from their rows rather than any single date's cell
+        employee_info = (
+            self.availability_df.groupby('EmployeeID', observed=True)[['Role', 'HourlyWage']].first()
+            .reindex(data['employees'])
+        )
+        roles = employee_info['Role'].tolist()
+        wages = employee_info['HourlyWage'].tolist()
+        
+        # Employees are interchangeable only if role, wage, weekly cap and every day's
+        # availability match, since then any schedule can swap them wholesale
+        classes = defaultdict(list)
+        for e in np.argsort(data['employees'], kind='stable').tolist():
+            profile = (
+                roles[e],
+                wages[e],
+                data['max_weekly_hours'][e],
+                hours_avail[:, e].tobytes()
+            )
+            classes[profile].append(e)
+        
+        # Per-date ordering would cut optimal schedules when weekly caps bind, so order
+        # each consecutive pair by total hours over the horizon instead
+        for members in classes.values():
+            totals = [
+                cp_model.LinearExpr.Sum([
+                    variables[(d, e)] for d in np.flatnonzero(hours_avail[:, e]).tolist()
+                ])
+                for e in members
+            ]
+            for total_a, total_b in zip(totals, totals[1:]):
+                model.Add(total_a >= total_b)
+    
+    def _greedy_initial(self, data: Dict) -> np.ndarray:
+        """Build a cheap heuristic schedule used to warm-start the solver.
+        
+        Returns a (date, employee) matrix of hours aligned with data['hours_avail'].
+        """
+        
+        return greedy_assign(
+            data['hours_avail'],
+            data['wage'],
+            data['role'] == 'supervisor',
+            data['demand_array'],
+            data['week_idx'],
+            data['max_weekly_hours']
+        )
+    
+    def solve(self, time_limit_seconds: int = 30, solver_params: Optional[Dict] = None,
+              break_symmetry: bool = False) -> Dict:
+        """Solve the optimization problem.
+        
+        solver_params maps CP-SAT parameter names to values (e.g. the output of a
+        tuning run) and overrides DEFAULT_SOLVER_PARAMS. break_symmetry is passed
+        to build_model.
+        """
         
         data = self.prepare_data()
-        model = self.build_model(data)
+        model = self.build_model(data, break_symmetry=break_symmetry)
+        
+        # Warm-start from the greedy schedule
+        greedy = self._greedy_initial(data)
+        for (d, e), var in self.variables.items():
+            model.AddHint(var, int(greedy[d, e]))
         
         # Create solver
         solver = cp_model.CpSolver()
+        for name, value in {**DEFAULT_SOLVER_PARAMS, **(solver_params or {})}.items():
+            setattr(solver.parameters, name, value)
         solver.parameters.max_time_in_seconds = time_limit_seconds
         
         # Solve
@@ -153,33 +255,43 @@ class WorkforceOptimizer:
             solution = {}
             total_cost = 0
             
-            for (date, employee), var in self.variables.items():
+            dates = data['dates']
+            employees = data['employees']
+            for (d, e), var in self.variables.items():
                 hours_worked = solver.Value(var)
                 if hours_worked > 0:
-                    wage = data['wage_matrix'][(date, employee)]
+                    wage = float(data['wage'][d, e])
                     cost = hours_worked * wage
                     total_cost += cost
                     
-                    solution[(date, employee)] = {
+                    solution[(dates[d], employees[e])] = {
                         'hours_worked': hours_worked,
                         'wage': wage,
                         'cost': cost,
-                        'role': data['role_matrix'][(date, employee)]
+                        'role': data['role'][d, e]
                     }
             
-            return {
+            result = {
                 'status': 'optimal' if status == cp_model.OPTIMAL else 'feasible',
                 'solution': solution,
                 'total_cost': total_cost,
                 'solver_time': solver.WallTime()
             }
         else:
-            return {
+            result = {
                 'status': 'infeasible',
                 'solution': {},
                 'total_cost': 0,
                 'solver_time': solver.WallTime()
             }
+        
+        # Values are extracted, so the model and its variable wrappers can be freed
+        self.close()
+        return result
+    
+    def close(self) -> None:
+        """Release the CP-SAT variables held since the last build_model call."""
+        self.variables = {}
     
     def get_schedule_dataframe(self, solution: Dict) -> pd.DataFrame:
         """Convert solution to a pandas DataFrame for display."""
@@ -187,48 +299,50 @@ class WorkforceOptimizer:
         if not solution:
             return pd.DataFrame()
         
-        records = []
-        for (date, employee), data in solution.items():
-            records.append({
-                'Date': date,
-                'EmployeeID': employee,
-                'HoursWorked': data['hours_worked'],
-                'Wage': data['wage'],
-                'Cost': data['cost'],
-                'Role': data['role']
-            })
-        
-        df = pd.DataFrame(records)
-        if not df.empty:
-            df = df.sort_values(['Date', 'EmployeeID'])
-        
-        return df
+        # Parallel columns straight from the solution dict
+        keys = list(solution.keys())
+        values = list(solution.values())
+        dates = pd.DatetimeIndex([date for date, _ in keys]).to_numpy()
+        employees = np.array([employee for _, employee in keys])
+        hours = np.fromiter((v['hours_worked'] for v in values), dtype=np.int64, count=len(values))
+        wages = np.fromiter((v['wage'] for v in values), dtype=np.float64, count=len(values))
+        costs = np.fromiter((v['cost'] for v in values), dtype=np.float64, count=len(values))
+        roles = np.array([v['role'] for v in values])
+        
+        # Sort by Date, then EmployeeID, before building the frame
+        order = np.lexsort((employees, dates))
+        
+        return pd.DataFrame({
+            'Date': dates[order],
+            'EmployeeID': employees[order],
+            'HoursWorked': hours[order],
+            'Wage': wages[order],
+            'Cost': costs[order],
+            'Role': roles[order]
+        })
     
-    def calculate_kpis(self, solution: Dict, original_data: Dict) -> Dict:
+    def calculate_kpis(self, schedule_df: pd.DataFrame, original_data: Dict) -> Dict:
         """Calculate key performance indicators."""
         
-        if not solution:
+        if schedule_df.empty:
             return {}
         
-        # Total cost
-        total_cost = sum(data['cost'] for data in solution.values())
+        hours = schedule_df['HoursWorked'].to_numpy()
         
-        # Total hours
-        total_hours = sum(data['hours_worked'] for data in solution.values())
+        # Total cost and hours
+        total_cost = float(schedule_df['Cost'].to_numpy().sum())
+        total_hours = int(hours.sum())
         
-        # Overtime calculation (simplified)
-        overtime_hours = 0
-        for (date, employee), data in solution.items():
-            if data['hours_worked'] > 8:  # Overtime if more than 8 hours
-                overtime_hours += data['hours_worked'] - 8
+        # Overtime calculation (simplified): hours beyond 8 in a shift
+        overtime_hours = int(compute_overtime(hours))
         
         # Coverage calculation
-        total_demand = sum(original_data['demand_lookup'].values())
+        total_demand = int(original_data['demand_array'].sum())
         coverage_percentage = min(100, (total_hours * 10) / total_demand * 100)  # 1 hour covers 10 customers
         
         # Average staff per day
         dates = original_data['dates']
-        avg_staff_per_day = len(solution) / len(dates) if dates else 0
+        avg_staff_per_day = len(schedule_df) / len(dates) if dates else 0
         
         return {
             'total_cost': total_cost,
@@ -236,30 +350,53 @@ class WorkforceOptimizer:
             'overtime_hours': overtime_hours,
             'coverage_percentage': coverage_percentage,
             'avg_staff_per_day': avg_staff_per_day,
-            'total_employees': len(set(emp for (_, emp) in solution.keys()))
+            'total_employees': schedule_df['EmployeeID'].nunique()
         }
 
-def optimize_workforce_schedule(availability_df: pd.DataFrame, demand_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict, Dict]:
+def _hash_dataframe(df: pd.DataFrame) -> bytes:
+    """Content hash used as the st.cache_data key for DataFrame arguments."""
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+# Bounded so a session sweeping the sliders can't pile up schedules without limit
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs={pd.DataFrame: _hash_dataframe})
+def _solve_workforce_schedule(availability_df: pd.DataFrame, demand_df: pd.DataFrame,
+                              time_limit_seconds: int = 30,
+                              break_symmetry: bool = False) -> Tuple[pd.DataFrame, Dict, Dict]:
+    """Solve and post-process one schedule; cached so identical reruns skip the solver."""
+    
+    optimizer = WorkforceOptimizer(availability_df, demand_df)
+    solution_info = optimizer.solve(time_limit_seconds=time_limit_seconds, break_symmetry=break_symmetry)
+    
+    if solution_info['status'] in ['optimal', 'feasible']:
+        schedule_df = optimizer.get_schedule_dataframe(solution_info['solution'])
+        data = optimizer.prepare_data()
+        kpis = optimizer.calculate_kpis(schedule_df, data)
+        
+        return schedule_df, kpis, solution_info
+    else:
+        return pd.DataFrame(), {}, solution_info
+
+def optimize_workforce_schedule(availability_df: pd.DataFrame, demand_df: pd.DataFrame,
+                                time_limit_seconds: int = 30,
+                                break_symmetry: bool = False) -> Tuple[pd.DataFrame, Dict, Dict]:
     """
     Main function to optimize workforce schedule.
     
+    Set break_symmetry for inputs with interchangeable employees (same role, wage,
+    weekly cap and availability); see WorkforceOptimizer.build_model.
+    
     Returns:
         - schedule_df: Optimized schedule as DataFrame
         - kpis: Key performance indicators
         - solution_info: Solution metadata
     """
     
-    optimizer = WorkforceOptimizer(availability_df, demand_df)
-    
     with st.spinner("Optimizing workforce schedule..."):
-        solution_info = optimizer.solve(time_limit_seconds=30)
+        schedule_df, kpis, solution_info = _solve_workforce_schedule(
+            availability_df, demand_df, time_limit_seconds, break_symmetry
+        )
     
-    if solution_info['status'] in ['optimal', 'feasible']:
-        schedule_df = optimizer.get_schedule_dataframe(solution_info['solution'])
-        data = optimizer.prepare_data()
-        kpis = optimizer.calculate_kpis(solution_info['solution'], data)
-        
-        return schedule_df, kpis, solution_info
-    else:
+    if solution_info['status'] not in ['optimal', 'feasible']:
         st.error("Unable to find a feasible solution. Please check your constraints.")
-        return pd.DataFrame(), {}, solution_info
+    
+    return schedule_df, kpis, solution_info
@@ -3,6 +3,7 @@ Visualization utilities for ShiftWise dashboard.
 Supports both dark and light themes with adaptive colors.
 """
 
+import functools
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
@@ -10,15 +11,14 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 class ThemeColors:
     """Adaptive color scheme for dark/light themes."""
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def detect_theme():
-        """Detect if we're in dark mode."""
+        """Detect if we're in dark mode (the configured theme is fixed per process)."""
         try:
             import streamlit as st
             # Try multiple methods to detect dark theme
@@ -38,7 +38,12 @@ class ThemeColors:
     @staticmethod
     def get_colors():
         """Get color palette based on Streamlit theme."""
-        is_dark = ThemeColors.detect_theme()
+        return ThemeColors._palette(ThemeColors.detect_theme())
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=2)
+    def _palette(is_dark: bool) -> Dict[str, str]:
+        """Build the color palette for one theme; cached per theme."""
         
         if is_dark:
             return {
@@ -68,6 +73,72 @@ class ThemeColors:
                 'text': '#212529',         # Dark text
                 'text_secondary': '#6c757d' # Medium gray text
             }
+    
+    @staticmethod
+    def get_template() -> go.layout.Template:
+        """Get the shared chart layout template for the current Streamlit theme.
+        
+        Render figures using it with st.plotly_chart(..., theme=None); Streamlit's own
+        theme is merged into layout.template and would override these values.
+        """
+        return ThemeColors._template(ThemeColors.detect_theme())
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=2)
+    def _template(is_dark: bool) -> go.layout.Template:
+        """Build the layout shared by every chart; cached per theme."""
+        
+        colors = ThemeColors._palette(is_dark)
+        axis = dict(
+            title=dict(font=dict(size=16, color=colors['text'])),
+            tickfont=dict(size=14, color=colors['text']),
+            gridcolor=colors['text_secondary'],
+            color=colors['text']
+        )
+        
+        return go.layout.Template(layout=dict(
+            title=dict(
+                font=dict(size=22, color=colors['text']),
+                x=0.5,
+                xanchor='center'
+            ),
+            xaxis=axis,
+            yaxis=axis,
+            plot_bgcolor=colors['background'],
+            paper_bgcolor=colors['background'],
+            font=dict(color=colors['text']),
+            legend=dict(
+                x=1.02,  # Move legend to the right side
+                y=1,     # Position at the top
+                xanchor='left',  # Anchor to left edge
+                yanchor='top',   # Anchor to top edge
+                bgcolor=colors['surface'],
+                bordercolor=colors['text_secondary'],
+                font=dict(size=14, color=colors['text'])
+            ),
+            margin=dict(r=150)  # Add right margin to accommodate legend
+        ))
+
+# Maximum number of points per line trace sent to the browser
+MAX_TRACE_POINTS = 2000
+
+def downsample_minmax(x, y, max_points: int = MAX_TRACE_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a series to at most max_points by keeping the min and max of each bucket."""
+    
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    
+    # Split into equal-width buckets and sort by value within each bucket
+    num_buckets = max_points // 2
+    edges = np.linspace(0, len(y), num_buckets + 1).astype(int)
+    bucket_ids = np.repeat(np.arange(num_buckets), np.diff(edges))
+    order = np.lexsort((y, bucket_ids))
+    
+    # First and last entries of each sorted bucket are its min and max
+    keep = np.unique(np.concatenate((order[edges[:-1]], order[edges[1:] - 1])))
+    return x[keep], y[keep]
 
 def create_demand_vs_staff_chart(demand_df: pd.DataFrame, schedule_df: pd.DataFrame, 
                                 title: str = "Demand vs Staff Coverage") -> go.Figure:
@@ -89,10 +160,13 @@ def create_demand_vs_staff_chart(demand_df: pd.DataFrame, schedule_df: pd.DataFr
     # Create figure
     fig = go.Figure()
     
+    # Long horizons are downsampled so only a bounded number of points is serialized
+    demand_x, demand_y = downsample_minmax(merged_df['Date'], merged_df['ForecastedDemand'])
+    
     # Add demand line
-    fig.add_trace(go.Scatter(
-        x=merged_df['Date'],
-        y=merged_df['ForecastedDemand'],
+    fig.add_trace(go.Scattergl(
+        x=demand_x,
+        y=demand_y,
         mode='lines+markers',
         name='Forecasted Demand',
         line=dict(color=colors['primary'], width=3),
@@ -101,49 +175,21 @@ def create_demand_vs_staff_chart(demand_df: pd.DataFrame, schedule_df: pd.DataFr
     
     # Add staff coverage line (convert hours to equivalent demand coverage)
     # Assume 1 hour of work covers 10 customers
-    staff_coverage = merged_df['HoursWorked'] * 10
-    fig.add_trace(go.Scatter(
-        x=merged_df['Date'],
-        y=staff_coverage,
+    staff_x, staff_y = downsample_minmax(merged_df['Date'], merged_df['HoursWorked'] * 10)
+    fig.add_trace(go.Scattergl(
+        x=staff_x,
+        y=staff_y,
         mode='lines+markers',
         name='Staff Coverage (Hours × 10)',
         line=dict(color=colors['secondary'], width=3),
         marker=dict(size=6)
     ))
     
-    # Update layout
     fig.update_layout(
-        title=dict(
-            text=title,
-            font=dict(size=24, color=colors['text']),
-            x=0.5,
-            xanchor='center'
-        ),
-        xaxis=dict(
-            title=dict(text='Date', font=dict(size=16, color=colors['text'])),
-            tickfont=dict(size=14, color=colors['text']),
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        yaxis=dict(
-            title=dict(text='Number of Customers', font=dict(size=16, color=colors['text'])),
-            tickfont=dict(size=14, color=colors['text']),
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text']),
-        legend=dict(
-            x=1.02,  # Move legend to the right side
-            y=1,     # Position at the top
-            xanchor='left',  # Anchor to left edge
-            yanchor='top',   # Anchor to top edge
-            bgcolor=colors['surface'],
-            bordercolor=colors['text_secondary'],
-            font=dict(size=14, color=colors['text'])
-        ),
-        margin=dict(r=150)  # Add right margin to accommodate legend
+        template=ThemeColors.get_template(),
+        title=dict(text=title, font_size=24),
+        xaxis_title='Date',
+        yaxis_title='Number of Customers'
     )
     
     return fig
@@ -167,27 +213,7 @@ def create_cost_breakdown_chart(schedule_df: pd.DataFrame, title: str = "Cost Br
         marker_colors=[colors['primary'], colors['secondary'], colors['success']]
     )])
     
-    fig.update_layout(
-        title=dict(
-            text=title,
-            font=dict(size=22, color=colors['text']),
-            x=0.5,
-            xanchor='center'
-        ),
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text']),
-        legend=dict(
-            x=1.02,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            bgcolor=colors['surface'],
-            bordercolor=colors['text_secondary'],
-            font=dict(size=14, color=colors['text'])
-        ),
-        margin=dict(r=150)
-    )
+    fig.update_layout(template=ThemeColors.get_template(), title=title)
     
     return fig
 
@@ -199,11 +225,9 @@ def create_weekly_hours_chart(schedule_df: pd.DataFrame, title: str = "Weekly Ho
     
     colors = ThemeColors.get_colors()
     
-    # Calculate weekly hours
-    schedule_df['Date'] = pd.to_datetime(schedule_df['Date'])
-    schedule_df['Week'] = schedule_df['Date'].dt.to_period('W')
-    
-    weekly_hours = schedule_df.groupby('Week')['HoursWorked'].sum().reset_index()
+    # Calculate weekly hours without touching the caller's frame
+    weeks = pd.to_datetime(schedule_df['Date']).dt.to_period('W').rename('Week')
+    weekly_hours = schedule_df['HoursWorked'].groupby(weeks).sum().reset_index()
     weekly_hours['Week_Str'] = weekly_hours['Week'].astype(str)
     
     # Create bar chart
@@ -218,37 +242,10 @@ def create_weekly_hours_chart(schedule_df: pd.DataFrame, title: str = "Weekly Ho
     ])
     
     fig.update_layout(
-        title=dict(
-            text=title,
-            font=dict(size=22, color=colors['text']),
-            x=0.5,
-            xanchor='center'
-        ),
-        xaxis=dict(
-            title=dict(text='Week', font=dict(size=16, color=colors['text'])),
-            tickfont=dict(size=14, color=colors['text']),
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        yaxis=dict(
-            title=dict(text='Total Hours', font=dict(size=16, color=colors['text'])),
-            tickfont=dict(size=14, color=colors['text']),
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text']),
-        legend=dict(
-            x=1.02,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            bgcolor=colors['surface'],
-            bordercolor=colors['text_secondary'],
-            font=dict(size=14, color=colors['text'])
-        ),
-        margin=dict(r=150)
+        template=ThemeColors.get_template(),
+        title=title,
+        xaxis_title='Week',
+        yaxis_title='Total Hours'
     )
     
     return fig
@@ -283,36 +280,11 @@ def create_employee_utilization_chart(schedule_df: pd.DataFrame, title: str = "E
     ])
     
     fig.update_layout(
-        title=dict(
-            text=title,
-            font=dict(size=22, color=colors['text']),
-            x=0.5,
-            xanchor='center'
-        ),
-        xaxis=dict(
-            title='Total Hours Worked',
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        yaxis=dict(
-            title='Employee ID',
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text']),
-        height=600,
-        legend=dict(
-            x=1.02,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            bgcolor=colors['surface'],
-            bordercolor=colors['text_secondary'],
-            font=dict(size=14, color=colors['text'])
-        ),
-        margin=dict(r=150)
+        template=ThemeColors.get_template(),
+        title=title,
+        xaxis_title='Total Hours Worked',
+        yaxis_title='Employee ID',
+        height=600
     )
     
     return fig
@@ -323,57 +295,27 @@ def create_heatmap(schedule_df: pd.DataFrame, title: str = "Schedule Heatmap") -
     if schedule_df.empty:
         return go.Figure()
     
-    colors = ThemeColors.get_colors()
-    
-    # Prepare data for heatmap
-    schedule_df['Date'] = pd.to_datetime(schedule_df['Date'])
-    pivot_data = schedule_df.pivot_table(
-        values='HoursWorked',
-        index='EmployeeID',
-        columns='Date',
-        fill_value=0
-    )
+    # Prepare data for heatmap: (EmployeeID, Date) is unique, so scatter hours into a zero grid
+    emp_codes, employees = pd.factorize(schedule_df['EmployeeID'], sort=True)
+    date_codes, dates = pd.factorize(pd.to_datetime(schedule_df['Date']), sort=True)
+    hours = np.zeros((len(employees), len(dates)))
+    hours[emp_codes, date_codes] = schedule_df['HoursWorked'].to_numpy()
     
     # Create heatmap
     fig = go.Figure(data=go.Heatmap(
-        z=pivot_data.values,
-        x=pivot_data.columns.strftime('%Y-%m-%d'),
-        y=pivot_data.index,
+        z=hours,
+        x=dates.strftime('%Y-%m-%d'),
+        y=employees,
         colorscale='Blues',
         showscale=True,
         colorbar=dict(title="Hours Worked")
     ))
     
     fig.update_layout(
-        title=dict(
-            text=title,
-            font=dict(size=22, color=colors['text']),
-            x=0.5,
-            xanchor='center'
-        ),
-        xaxis=dict(
-            title='Date',
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        yaxis=dict(
-            title='Employee ID',
-            gridcolor=colors['text_secondary'],
-            color=colors['text']
-        ),
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text']),
-        legend=dict(
-            x=1.02,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            bgcolor=colors['surface'],
-            bordercolor=colors['text_secondary'],
-            font=dict(size=14, color=colors['text'])
-        ),
-        margin=dict(r=150)
+        template=ThemeColors.get_template(),
+        title=title,
+        xaxis_title='Date',
+        yaxis_title='Employee ID'
     )
     
     return fig
@@ -427,25 +369,16 @@ def create_scenario_comparison_chart(original_kpis: Dict, scenario_kpis: Dict,
     metrics = ['total_cost', 'total_hours', 'coverage_percentage', 'overtime_hours']
     metric_labels = ['Total Cost ($)', 'Total Hours', 'Coverage (%)', 'Overtime Hours']
     
-    original_values = [original_kpis.get(metric, 0) for metric in metrics]
-    scenario_values = [scenario_kpis.get(metric, 0) for metric in metrics]
+    original_values = np.array([original_kpis.get(metric, 0) for metric in metrics], dtype=float)
+    scenario_values = np.array([scenario_kpis.get(metric, 0) for metric in metrics], dtype=float)
     
-    # Normalize values for comparison (except coverage percentage)
-    normalized_original = []
-    normalized_scenario = []
+    # Normalize values against the larger of the pair (0 when both are 0), except coverage percentage
+    max_values = np.maximum(original_values, scenario_values)
+    scale = np.divide(100, max_values, out=np.zeros_like(max_values), where=max_values > 0)
+    scale[metrics.index('coverage_percentage')] = 1
     
-    for i, metric in enumerate(metrics):
-        if metric == 'coverage_percentage':
-            normalized_original.append(original_values[i])
-            normalized_scenario.append(scenario_values[i])
-        else:
-            max_val = max(original_values[i], scenario_values[i])
-            if max_val > 0:
-                normalized_original.append(original_values[i] / max_val * 100)
-                normalized_scenario.append(scenario_values[i] / max_val * 100)
-            else:
-                normalized_original.append(0)
-                normalized_scenario.append(0)
+    normalized_original = original_values * scale
+    normalized_scenario = scenario_values * scale
     
     fig = go.Figure()
     
@@ -464,13 +397,11 @@ def create_scenario_comparison_chart(original_kpis: Dict, scenario_kpis: Dict,
     ))
     
     fig.update_layout(
+        template=ThemeColors.get_template(),
         title=f"Original vs {scenario_name} Comparison",
         xaxis_title="Metrics",
         yaxis_title="Normalized Values (%)",
-        barmode='group',
-        plot_bgcolor=colors['background'],
-        paper_bgcolor=colors['background'],
-        font=dict(color=colors['text'])
+        barmode='group'
     )
     
     return fig